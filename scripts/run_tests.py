@@ -7,6 +7,7 @@ with proper configuration and reporting.
 """
 
 import argparse
+import py_compile
 import subprocess
 import sys
 from pathlib import Path
@@ -91,15 +92,23 @@ def lint_and_test():
     
     # Try to run basic Python syntax checks
     try:
-        cmd = ["python", "-m", "py_compile"]
         src_files = list(Path("src").rglob("*.py"))
         test_files = list(Path("tests").rglob("*.py"))
+        py_files = src_files + test_files
         
-        for py_file in src_files + test_files:
-            result = subprocess.run([*cmd, str(py_file)], capture_output=True)
-            if result.returncode != 0:
-                print(f"Syntax error in {py_file}")
-                return False
+        # Compile in this interpreter rather than one py_compile process per
+        # file, collecting every failure in a single pass
+        failed = []
+        for py_file in py_files:
+            try:
+                py_compile.compile(str(py_file), doraise=True)
+            except py_compile.PyCompileError:
+                failed.append(py_file)
+        
+        for py_file in failed:
+            print(f"Syntax error in {py_file}")
+        if failed:
+            return False
         
         print("✓ Syntax checks passed")
     except Exception as e:
@@ -415,16 +415,20 @@ class AndroidManager:
         console.print("[blue]Verifying Android SDK installation...[/blue]")
 
         # Check if essential tools exist
+        sdkmanager_path = self.android_cmdline_tools_dir / "bin" / "sdkmanager"
         essential_tools = [
-            (self.android_cmdline_tools_dir / "bin" / "sdkmanager", "SDK Manager"),
+            (sdkmanager_path, "SDK Manager"),
             (self.android_platform_tools_dir / "adb", "ADB"),
             (self.android_platform_tools_dir / "fastboot", "Fastboot"),
         ]
 
         all_good = True
+        # Probed once here and reused for the sdkmanager command test below
+        found = set()
 
         for tool_path, tool_name in essential_tools:
             if tool_path.exists():
+                found.add(tool_path)
                 console.print(f"[green]✓ {tool_name} found at {tool_path}[/green]")
             else:
                 console.print(f"[red]✗ {tool_name} not found at {tool_path}[/red]")
@@ -457,8 +461,7 @@ class AndroidManager:
             all_good = False
 
         # Test sdkmanager command
-        sdkmanager_path = self.android_cmdline_tools_dir / "bin" / "sdkmanager"
-        if sdkmanager_path.exists():
+        if sdkmanager_path in found:
             try:
                 result = self.executor.run_command(
                     f'"{sdkmanager_path}" --list',
@@ -3,7 +3,7 @@
 import os
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Mapping, Optional
 from packaging.version import Version
 
 
@@ -102,42 +102,47 @@ class EnvironmentConfig:
         return self.fvm_dir / "default" / "bin" / "flutter"
 
     @classmethod
-    def from_environment(cls) -> "EnvironmentConfig":
-        """Create configuration from environment variables."""
+    def from_environment(cls, env: Optional[Mapping[str, str]] = None) -> "EnvironmentConfig":
+        """Create configuration from environment variables.
+
+        Variables are read from ``env`` when given, otherwise from ``os.environ``.
+        """
+        if env is None:
+            env = os.environ
         config = cls()
 
         # Override with environment variables if present
-        config.auto_update_script = os.getenv("AUTO_UPDATE_SCRIPT", "false").lower() == "true"
-        config.skip_recursive_update = os.getenv("SKIP_RECURSIVE_UPDATE", "false").lower() == "true"
-        config.parallel_execution = os.getenv("PARALLEL_EXECUTION", "true").lower() == "true"
-        config.flutter_install_method = os.getenv("FLUTTER_INSTALL_METHOD", "precompiled")
-        config.fetch_all_remote_branches = os.getenv("FETCH_ALL_REMOTE_BRANCHES", "true").lower() == "true"
-        config.should_fetch_agents_docs = os.getenv("SHOULD_FETCH_AGENTS_DOCS", "true").lower() == "true"
-        config.should_fetch_kdf_api_docs = os.getenv("SHOULD_FETCH_KDF_API_DOCS", "false").lower() == "true"
-        config.install_android_sdk = os.getenv("INSTALL_ANDROID_SDK", "true").lower() == "true"
-        config.install_type = os.getenv("INSTALL_TYPE", "ALL").upper()
+        config.auto_update_script = env.get("AUTO_UPDATE_SCRIPT", "false").lower() == "true"
+        config.skip_recursive_update = env.get("SKIP_RECURSIVE_UPDATE", "false").lower() == "true"
+        config.parallel_execution = env.get("PARALLEL_EXECUTION", "true").lower() == "true"
+        config.flutter_install_method = env.get("FLUTTER_INSTALL_METHOD", "precompiled")
+        config.fetch_all_remote_branches = env.get("FETCH_ALL_REMOTE_BRANCHES", "true").lower() == "true"
+        config.should_fetch_agents_docs = env.get("SHOULD_FETCH_AGENTS_DOCS", "true").lower() == "true"
+        config.should_fetch_kdf_api_docs = env.get("SHOULD_FETCH_KDF_API_DOCS", "false").lower() == "true"
+        config.install_android_sdk = env.get("INSTALL_ANDROID_SDK", "true").lower() == "true"
+        config.install_type = env.get("INSTALL_TYPE", "ALL").upper()
         
         # Android configuration overrides
-        android_api_level = os.getenv("ANDROID_API_LEVEL")
+        android_api_level = env.get("ANDROID_API_LEVEL")
         if android_api_level:
             config.android_api_level = android_api_level
             
-        android_build_tools = os.getenv("ANDROID_BUILD_TOOLS_VERSION")
+        android_build_tools = env.get("ANDROID_BUILD_TOOLS_VERSION")
         if android_build_tools:
             config.android_build_tools_version = android_build_tools
 
         # Android SDK path override
-        android_home_env = os.getenv("ANDROID_HOME") or os.getenv("ANDROID_SDK_ROOT")
+        android_home_env = env.get("ANDROID_HOME") or env.get("ANDROID_SDK_ROOT")
         if android_home_env:
             config.android_home = Path(android_home_env)
 
         # Handle platforms
-        platforms_env = os.getenv("PLATFORMS")
+        platforms_env = env.get("PLATFORMS")
         if platforms_env:
             config.platforms = [p.strip() for p in platforms_env.split(",")]
 
         # Handle max parallel jobs
-        max_jobs_env = os.getenv("MAX_PARALLEL_JOBS")
+        max_jobs_env = env.get("MAX_PARALLEL_JOBS")
         if max_jobs_env and max_jobs_env.isdigit():
             config.max_parallel_jobs = int(max_jobs_env)
 
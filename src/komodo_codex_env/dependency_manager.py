@@ -226,35 +226,6 @@ class DependencyManager:
             console.print(f"[red]Pacman installation failed: {e}[/red]")
             return False
     
-    def check_disk_space(self, required_gb: float, path: Optional[Path] = None) -> bool:
-        """Check if there's enough disk space available."""
-        if path is None:
-            path = Path.home()
-        
-        try:
-            result = self.executor.run_command(
-                f"df -k {path}",
-                capture_output=True
-            )
-            
-            # Parse df output
-            lines = result.stdout.strip().split("\n")
-            if len(lines) >= 2:
-                # Get available space in KB
-                available_kb = int(lines[1].split()[3])
-                available_gb = available_kb / (1024 * 1024)
-                
-                console.print(f"[blue]Available space: {available_gb:.1f}GB, Required: {required_gb}GB[/blue]")
-                
-                return available_gb >= required_gb
-            
-        except Exception as e:
-            console.print(f"[yellow]Warning: Could not check disk space: {e}[/yellow]")
-            # Assume we have enough space if check fails
-            return True
-        
-        return False
-    
     def get_system_info(self) -> Dict[str, str]:
         """Get basic system information."""
         info = {}
@@ -459,28 +430,15 @@ class DependencyManager:
             path = Path.home()
         
         try:
-            result = self.executor.run_command(
-                f"df -k {path}",
-                capture_output=True
-            )
-            
-            # Parse df output
-            lines = result.stdout.strip().split("\n")
-            if len(lines) >= 2:
-                # Get available space in KB
-                available_kb = int(lines[1].split()[3])
-                available_gb = available_kb / (1024 * 1024)
-                
-                console.print(f"[blue]Available space: {available_gb:.1f}GB, Required: {required_gb}GB[/blue]")
-                
-                return available_gb >= required_gb
-            
+            # statvfs on the path instead of spawning and parsing df
+            available_gb = shutil.disk_usage(path).free / (1024 ** 3)
         except Exception as e:
             console.print(f"[yellow]Warning: Could not check disk space: {e}[/yellow]")
             # Assume we have enough space if check fails
             return True
         
-        return False
+        console.print(f"[blue]Available space: {available_gb:.1f}GB, Required: {required_gb}GB[/blue]")
+        return available_gb >= required_gb
     
     def get_system_info(self) -> Dict[str, str]:
         """Get basic system information."""
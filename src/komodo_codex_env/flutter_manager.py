@@ -1,6 +1,7 @@
 """Flutter SDK installation and management using FVM (Flutter Version Management)."""
 
 import json
+import re
 import subprocess
 from pathlib import Path
 from typing import Optional, List
@@ -24,6 +25,11 @@ class FlutterManager:
         self.dep_manager = dep_manager
         self.fvm_home = self.config.home_dir / ".fvm"
         self.fvm_bin = self.fvm_home / "default" / "bin" / "flutter"
+    
+    @staticmethod
+    def _is_file(path: Path) -> bool:
+        """Check whether a candidate FVM location is an existing file."""
+        return path.is_file()
         
     def is_fvm_installed(self) -> bool:
         """Check if FVM is installed."""
@@ -46,7 +52,7 @@ class FlutterManager:
             ])
         
         for fvm_path in common_paths:
-            if fvm_path.exists() and fvm_path.is_file():
+            if self._is_file(fvm_path):
                 # Check if the path is accessible before adding to PATH
                 try:
                     # Test accessibility by trying to read the file
@@ -253,6 +259,25 @@ class FlutterManager:
         
         return []
     
+    def is_version_installed(self, version: str) -> bool:
+        """Check whether FVM's cache already holds the given Flutter version."""
+        result = self.executor.run_command(
+            "fvm list",
+            capture_output=True,
+            check=False
+        )
+        if result.returncode != 0:
+            return False
+        
+        # Only the first column names the cached version; the Channel and
+        # Flutter Version columns would otherwise make "stable" or a release
+        # number look cached. Whole cells, so "3.3" does not match "3.32.0"
+        for line in result.stdout.splitlines():
+            cells = [cell.strip() for cell in re.split(r"[│|]", line) if cell.strip()]
+            if cells and cells[0].split()[0] == version:
+                return True
+        return False
+    
     def install_flutter(self) -> bool:
         """Install Flutter using FVM."""
         # First ensure FVM is installed
@@ -260,33 +285,37 @@ class FlutterManager:
             console.print("[red]Cannot install Flutter without FVM[/red]")
             return False
 
-        # Check for sufficient disk space (~1.5 GB required)
-        if not self.dep_manager.check_disk_space(1.5, self.config.home_dir):
-            console.print("[red]Not enough disk space for Flutter installation[/red]")
-            return False
-        
-        console.print(f"[blue]Installing Flutter {self.config.flutter_version} via FVM...[/blue]")
-        
         try:
-            # Install the specified Flutter version
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console
-            ) as progress:
-                task = progress.add_task(f"Installing Flutter {self.config.flutter_version}...", total=None)
+            # A warm FVM cache already has the version; skip the install round-trip
+            if self.is_version_installed(self.config.flutter_version):
+                console.print(f"[green]Flutter {self.config.flutter_version} already installed in FVM cache[/green]")
+            else:
+                # Check for sufficient disk space (~1.5 GB required)
+                if not self.dep_manager.check_disk_space(1.5, self.config.home_dir):
+                    console.print("[red]Not enough disk space for Flutter installation[/red]")
+                    return False
                 
-                result = self.executor.run_command(
-                    f"fvm install {self.config.flutter_version}",
-                    timeout=600,  # 10 minutes timeout
-                    check=False
-                )
+                console.print(f"[blue]Installing Flutter {self.config.flutter_version} via FVM...[/blue]")
                 
-                progress.update(task, completed=True)
-            
-            if result.returncode != 0:
-                console.print(f"[red]Failed to install Flutter {self.config.flutter_version}[/red]")
-                return False
+                # Install the specified Flutter version
+                with Progress(
+                    SpinnerColumn(),
+                    TextColumn("[progress.description]{task.description}"),
+                    console=console
+                ) as progress:
+                    task = progress.add_task(f"Installing Flutter {self.config.flutter_version}...", total=None)
+                    
+                    result = self.executor.run_command(
+                        f"fvm install {self.config.flutter_version}",
+                        timeout=600,  # 10 minutes timeout
+                        check=False
+                    )
+                    
+                    progress.update(task, completed=True)
+                
+                if result.returncode != 0:
+                    console.print(f"[red]Failed to install Flutter {self.config.flutter_version}[/red]")
+                    return False
             
             # Set as global default
             console.print(f"[blue]Setting Flutter {self.config.flutter_version} as global default...[/blue]")
@@ -630,13 +659,7 @@ class FlutterManager:
             console.print(f"[blue]Switching to Flutter {version}...[/blue]")
             
             # Check if version is installed
-            result = self.executor.run_command(
-                "fvm list",
-                capture_output=True,
-                check=False
-            )
-            
-            if result.returncode == 0 and version not in result.stdout:
+            if not self.is_version_installed(version):
                 console.print(f"[blue]Flutter {version} not installed, installing now...[/blue]")
                 install_result = self.executor.run_command(
                     f"fvm install {version}",
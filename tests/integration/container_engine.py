@@ -5,19 +5,65 @@ Provides a unified interface for Docker and Podman container operations,
 allowing tests to work with either container engine based on configuration.
 """
 
+import functools
+import json
 import os
+import shutil
+import socket
 import subprocess
 import logging
+import threading
+import http.client
+from collections import deque
 from typing import List, Optional, Dict
+from urllib.parse import quote, urlencode
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DOCKER_HOST = "unix:///var/run/docker.sock"
+
 
 class ContainerEngineError(Exception):
     """Exception raised for container engine operations."""
     pass
 
 
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection to the Docker daemon over its unix socket."""
+    
+    def __init__(self, socket_path: str, timeout: float = 120):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+    
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+@functools.lru_cache(maxsize=None)
+def _probe_engine(engine: str) -> Optional[str]:
+    """Return the engine's ``--version`` output, or None if it is unusable.
+    
+    A PATH lookup rules out missing engines without forking, and the result
+    is remembered, so detection, validation and availability checks share a
+    single ``--version`` call per engine.
+    """
+    if shutil.which(engine) is None:
+        return None
+    try:
+        result = subprocess.run(
+            [engine, '--version'], 
+            capture_output=True, 
+            check=True,
+            text=True,
+            timeout=10
+        )
+        return result.stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+
+
 class ContainerEngine:
     """Abstraction layer for container engine operations (Docker/Podman)."""
     
@@ -31,6 +77,7 @@ class ContainerEngine:
         """
         self.engine = self._determine_engine(engine)
         self._validate_engine()
+        self._api = self._connect_api()
         logger.info(f"Using container engine: {self.engine}")
     
     def _determine_engine(self, engine: Optional[str]) -> str:
@@ -62,16 +109,7 @@ class ContainerEngine:
     
     def _is_engine_available(self, engine: str) -> bool:
         """Check if a container engine is available."""
-        try:
-            result = subprocess.run(
-                [engine, '--version'], 
-                capture_output=True, 
-                check=True,
-                timeout=10
-            )
-            return result.returncode == 0
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+        return _probe_engine(engine) is not None
     
     def _validate_engine(self) -> None:
         """Validate that the selected engine is available."""
@@ -81,6 +119,24 @@ class ContainerEngine:
                 f"Please install {self.engine} or set CONTAINER_ENGINE to an available engine."
             )
     
+    def _connect_api(self) -> Optional[_UnixHTTPConnection]:
+        """Open a keep-alive connection to the Docker API socket, if reachable.
+        
+        Only used for Docker on a local unix socket; everything else goes
+        through the CLI.
+        """
+        if self.engine != 'docker':
+            return None
+        
+        host = os.getenv('DOCKER_HOST', DEFAULT_DOCKER_HOST)
+        if not host.startswith('unix://'):
+            return None
+        
+        socket_path = host[len('unix://'):]
+        if not os.path.exists(socket_path):
+            return None
+        return _UnixHTTPConnection(socket_path)
+    
     def _run_command(self, cmd: List[str], **kwargs) -> subprocess.CompletedProcess:
         """Run a container command with the selected engine."""
         full_cmd = [self.engine] + cmd[1:]  # Replace first element with selected engine
@@ -142,15 +198,72 @@ class ContainerEngine:
     
     def version(self) -> str:
         """Get container engine version."""
+        return _probe_engine(self.engine) or "unknown"
+    
+    def build(self, tag: str, dockerfile: str, context: str,
+              cache_from: Optional[List[str]] = None,
+              build_args: Optional[Dict[str, str]] = None,
+              target: Optional[str] = None,
+              **kwargs) -> subprocess.CompletedProcess:
+        """Build a container image, seeding the layer cache from ``cache_from`` images.
+        
+        ``target`` stops at the named stage of a multi-stage Dockerfile.
+        
+        Docker builds run under BuildKit with inline cache metadata, so the
+        resulting image can itself serve as a ``cache_from`` source later.
+        Podman reads ``--cache-from`` as a layer repository rather than an
+        image, so it is only passed to Docker.
+        """
+        cmd = [self.engine, 'build', '-t', tag, '-f', dockerfile]
+        
+        if target:
+            cmd.extend(['--target', target])
+        
+        if self.engine == 'docker':
+            kwargs['env'] = {**os.environ, **kwargs.get('env', {}), 'DOCKER_BUILDKIT': '1'}
+            build_args = {'BUILDKIT_INLINE_CACHE': '1', **(build_args or {})}
+            for image in cache_from or []:
+                cmd.extend(['--cache-from', image])
+        
+        for key, value in (build_args or {}).items():
+            cmd.extend(['--build-arg', f'{key}={value}'])
+        
+        cmd.append(context)
+        return self._run_command(cmd, **kwargs)
+    
+    def image_exists(self, tag: str) -> bool:
+        """Check whether an image with the given tag exists locally."""
+        cmd = [self.engine, 'image', 'inspect', tag]
+        result = self._run_command(cmd, capture_output=True)
+        return result.returncode == 0
+    
+    def tag(self, source: str, target: str, **kwargs) -> subprocess.CompletedProcess:
+        """Tag an existing image under another name."""
+        cmd = [self.engine, 'tag', source, target]
+        return self._run_command(cmd, **kwargs)
+    
+    def image_labels(self, tag: str) -> Dict[str, str]:
+        """Return the labels of a local image, empty if it has none or is missing."""
+        cmd = [self.engine, 'image', 'inspect', '--format', '{{json .Config.Labels}}', tag]
+        result = self._run_command(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            return {}
         try:
-            result = self._run_command([self.engine, '--version'], capture_output=True, text=True)
-            return result.stdout.strip()
-        except ContainerEngineError:
-            return "unknown"
+            return json.loads(result.stdout) or {}
+        except ValueError:
+            return {}
     
-    def build(self, tag: str, dockerfile: str, context: str, **kwargs) -> subprocess.CompletedProcess:
-        """Build a container image."""
-        cmd = [self.engine, 'build', '-t', tag, '-f', dockerfile, context]
+    def commit(self, container: str, tag: str,
+               labels: Optional[Dict[str, str]] = None,
+               **kwargs) -> subprocess.CompletedProcess:
+        """Save a container's filesystem as a new image, adding ``labels``."""
+        cmd = [self.engine, 'commit']
+        
+        if labels:
+            for key, value in labels.items():
+                cmd.extend(['--change', f'LABEL {key}={json.dumps(value)}'])
+        
+        cmd.extend([container, tag])
         return self._run_command(cmd, **kwargs)
     
     def run(self, image: str, command: Optional[List[str]] = None, 
@@ -159,6 +272,8 @@ class ContainerEngine:
             volumes: Optional[List[str]] = None,
             ports: Optional[List[str]] = None,
             extra_args: Optional[List[str]] = None,
+            labels: Optional[Dict[str, str]] = None,
+            remove: bool = False,
             **kwargs) -> subprocess.CompletedProcess:
         """Run a container."""
         cmd = [self.engine, 'run']
@@ -166,9 +281,16 @@ class ContainerEngine:
         if detach:
             cmd.append('-d')
         
+        if remove:
+            cmd.append('--rm')
+        
         if name:
             cmd.extend(['--name', name])
         
+        if labels:
+            for key, value in labels.items():
+                cmd.extend(['--label', f'{key}={value}'])
+        
         if environment:
             for key, value in environment.items():
                 cmd.extend(['--env', f'{key}={value}'])
@@ -193,26 +315,158 @@ class ContainerEngine:
     
     def exec(self, container: str, command: List[str], 
              user: Optional[str] = None, interactive: bool = False,
+             stdin: bool = False, detach: bool = False,
+             environment: Optional[Dict[str, str]] = None,
              **kwargs) -> subprocess.CompletedProcess:
-        """Execute command in running container."""
+        """Execute command in running container.
+        
+        Pass ``stdin=True`` together with ``input=...`` to feed data to the
+        command's standard input without allocating a TTY. With
+        ``detach=True`` the command keeps running in the background and this
+        call returns as soon as it has been started. ``environment`` is set
+        in the command's environment with ``--env``.
+        """
         cmd = [self.engine, 'exec']
         
         if user:
             cmd.extend(['-u', user])
         
-        if interactive:
+        if environment:
+            for key, value in environment.items():
+                cmd.extend(['--env', f'{key}={value}'])
+        
+        if detach:
+            cmd.append('-d')
+        elif interactive:
             cmd.append('-it')
+        elif stdin:
+            cmd.append('-i')
         
         cmd.append(container)
         cmd.extend(command)
         
         return self._run_command(cmd, **kwargs)
     
-    def cp(self, src: str, dest: str, **kwargs) -> subprocess.CompletedProcess:
-        """Copy files between host and container."""
-        cmd = [self.engine, 'cp', src, dest]
+    def exec_stream(self, container: str, command: List[str],
+                    user: Optional[str] = None, timeout: Optional[float] = None,
+                    tail_lines: int = 2000,
+                    input: Optional[str] = None,
+                    environment: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+        """Execute command in running container, streaming its output.
+        
+        stdout and stderr are merged and logged line by line as they arrive;
+        only the last ``tail_lines`` lines are kept and returned as stdout,
+        bounding memory for long, chatty commands. ``input`` is written to
+        the command's standard input.
+        """
+        cmd = [self.engine, 'exec']
+        
+        if user:
+            cmd.extend(['-u', user])
+        
+        if environment:
+            for key, value in environment.items():
+                cmd.extend(['--env', f'{key}={value}'])
+        
+        if input is not None:
+            cmd.append('-i')
+        
+        cmd.append(container)
+        cmd.extend(command)
+        
+        tail = deque(maxlen=tail_lines)
+        proc = subprocess.Popen(
+            self._adjust_command_for_engine(cmd),
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        if input is not None:
+            # Written from a thread so a chatty command can't fill the stdout
+            # pipe while we are still blocked sending it its input
+            def _feed():
+                try:
+                    proc.stdin.write(input)
+                except BrokenPipeError:
+                    pass
+                finally:
+                    proc.stdin.close()
+            
+            threading.Thread(target=_feed, daemon=True).start()
+        timed_out = threading.Event()
+        
+        def _kill():
+            timed_out.set()
+            proc.kill()
+        
+        timer = threading.Timer(timeout, _kill) if timeout else None
+        if timer:
+            timer.start()
+        try:
+            for line in proc.stdout:
+                logger.debug(line.rstrip())
+                tail.append(line)
+            proc.wait()
+        finally:
+            if timer:
+                timer.cancel()
+            proc.stdout.close()
+        
+        output = "".join(tail)
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout, output=output)
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout=output, stderr="")
+    
+    def cp(self, src: str, dest: str, archive: bool = False,
+           **kwargs) -> subprocess.CompletedProcess:
+        """Copy files between host and container.
+        
+        Use ``src='-'`` with ``input=<tar bytes>`` to stream a tar archive.
+        ``archive=True`` chowns the copied files to the container's user;
+        otherwise a tar stream keeps the uid/gid recorded in its headers.
+        """
+        cmd = [self.engine, 'cp']
+        
+        if archive:
+            cmd.append('-a')
+        elif self.engine == 'podman':
+            # Podman archives (chowns) by default
+            cmd.append('--archive=false')
+        
+        cmd.extend([src, dest])
         return self._run_command(cmd, **kwargs)
     
+    def put_archive(self, container: str, dest_dir: str, data: bytes) -> bool:
+        """Extract a tar archive into a container directory with its header ownership.
+        
+        Uses the Docker API socket when available, saving a CLI process per
+        upload, and falls back to ``cp -`` otherwise.
+        """
+        if self._api is not None:
+            # No copyUIDGID: that chowns to the container's user, not the tar ids
+            query = urlencode({'path': dest_dir})
+            try:
+                self._api.request(
+                    'PUT',
+                    f"/containers/{quote(container)}/archive?{query}",
+                    body=data,
+                    headers={'Content-Type': 'application/x-tar'}
+                )
+                response = self._api.getresponse()
+                body = response.read()
+                if response.status == 200:
+                    return True
+                logger.warning(f"Docker API upload failed ({response.status}): {body[:200]!r}")
+            except (OSError, http.client.HTTPException) as e:
+                logger.warning(f"Docker API upload failed, falling back to CLI: {e}")
+                self._api.close()
+        
+        result = self.cp('-', f"{container}:{dest_dir}",
+                         input=data, capture_output=True)
+        return result.returncode == 0
+    
     def rm(self, container: str, force: bool = False, **kwargs) -> subprocess.CompletedProcess:
         """Remove container."""
         cmd = [self.engine, 'rm']
@@ -228,13 +482,39 @@ class ContainerEngine:
         cmd = [self.engine, 'logs', container]
         return self._run_command(cmd, **kwargs)
     
-    def ps(self, all_containers: bool = False, **kwargs) -> subprocess.CompletedProcess:
-        """List containers."""
+    def volume_create(self, name: str, **kwargs) -> subprocess.CompletedProcess:
+        """Create a named volume; succeeds if it already exists."""
+        cmd = [self.engine, 'volume', 'create']
+        if self.engine == 'podman':
+            # Docker treats an existing volume as success; Podman needs asking
+            cmd.append('--ignore')
+        cmd.append(name)
+        return self._run_command(cmd, **kwargs)
+    
+    def volume_created_at(self, name: str) -> Optional[str]:
+        """Return when a named volume was created, or None if it is missing."""
+        cmd = [self.engine, 'volume', 'inspect', '--format', '{{.CreatedAt}}', name]
+        result = self._run_command(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+    
+    def ps(self, all_containers: bool = False, quiet: bool = False,
+           filters: Optional[Dict[str, str]] = None,
+           **kwargs) -> subprocess.CompletedProcess:
+        """List containers, optionally only IDs (``quiet``) matching ``filters``."""
         cmd = [self.engine, 'ps']
         
         if all_containers:
             cmd.append('-a')
         
+        if quiet:
+            cmd.append('-q')
+        
+        if filters:
+            for key, value in filters.items():
+                cmd.extend(['--filter', f'{key}={value}'])
+        
         return self._run_command(cmd, **kwargs)
     
     def stop(self, container: str, **kwargs) -> subprocess.CompletedProcess:
@@ -243,13 +523,15 @@ class ContainerEngine:
         return self._run_command(cmd, **kwargs)
 
 
+@functools.lru_cache(maxsize=1)
 def get_container_engine() -> ContainerEngine:
-    """Get a configured container engine instance."""
+    """Get the configured container engine instance, shared per process."""
     return ContainerEngine()
 
 
+@functools.lru_cache(maxsize=1)
 def container_available() -> bool:
-    """Check if any container engine is available."""
+    """Check if any container engine is available (probed once per process)."""
     try:
         engine = get_container_engine()
         return engine.is_available()
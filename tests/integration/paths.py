@@ -0,0 +1,35 @@
+"""
+Integration Test Paths
+
+Project paths used by the integration tests, resolved once at import so test
+modules share them instead of each recomputing them (and their string forms).
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class Paths:
+    """Absolute project paths along with the string forms passed to the engine."""
+
+    project_root: Path
+    dockerfile: Path
+    install_script: Path
+    project_root_str: str
+    dockerfile_str: str
+
+    @classmethod
+    def from_project_root(cls, project_root: Path) -> "Paths":
+        """Derive every path from the project root."""
+        dockerfile = project_root / ".devcontainer" / "Dockerfile"
+        return cls(
+            project_root=project_root,
+            dockerfile=dockerfile,
+            install_script=project_root / "install.sh",
+            project_root_str=str(project_root),
+            dockerfile_str=str(dockerfile),
+        )
+
+
+PATHS = Paths.from_project_root(Path(__file__).resolve().parents[2])
@@ -9,16 +9,12 @@ Tests the complete pipeline for Flutter development without Android SDK:
 """
 
 import logging
-from pathlib import Path
 
 from .base_integration_test import ContainerIntegrationTest
+from .paths import PATHS
 
 logger = logging.getLogger(__name__)
 
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
-DOCKERFILE = PROJECT_ROOT / ".devcontainer" / "Dockerfile"
-INSTALL_SCRIPT = PROJECT_ROOT / "install.sh"
-
 
 class FlutterOnlyIntegrationTest(ContainerIntegrationTest):
     """Test Flutter-only development environment setup and build."""
@@ -26,27 +22,28 @@ class FlutterOnlyIntegrationTest(ContainerIntegrationTest):
     # Class configuration for base class
     IMAGE_NAME = "flutter-only-test"
     CONTAINER_PREFIX = "flutter-only-test"
-    DOCKERFILE = DOCKERFILE
-    BUILD_CONTEXT = PROJECT_ROOT
+    DOCKERFILE = PATHS.dockerfile_str
+    BUILD_CONTEXT = PATHS.project_root_str
     CONTAINER_TIMEOUT = 7200  # 2 hours
-
-    def test_flutter_only_pipeline(self):
-        """Test the complete Flutter-only development pipeline."""
-        logger.info("Starting Flutter-only integration test pipeline")
-
+    # Reuse FVM and pub downloads between runs
+    CACHE_MOUNTS = {
+        "pub-cache": "/home/testuser/.pub-cache",
+        "fvm": "/home/testuser/fvm",
+    }
+
+    def _prepare_environment(self):
+        """Run install.sh and the komodo-codex-env setup (steps 1-3)."""
         try:
             # Step 1: Copy and run install script (without auto-setup)
             logger.info("Step 1: Running install script")
-            success = self.copy_to_container(INSTALL_SCRIPT, "/home/testuser/install.sh")
+            success = self.copy_install_script(PATHS.install_script, "/home/testuser/install.sh")
             self.assertTrue(success, "Failed to copy install script")
 
             install_command = """
             cd /home/testuser &&
-            sed -i 's/read -p "Do you want to run the full setup now.*/REPLY="n"/' install.sh &&
-            sed -i 's/kce-full-setup "$FLUTTER_VERSION"/echo "Skipping auto full setup"/' install.sh &&
             timeout 600 ./install.sh --debug
             """
-            result = self.run_in_container(install_command, timeout=700)
+            result = self.run_in_container(install_command, timeout=700, stream=True)
             self.skip_on_command_failure(result, "Install script failed")
             logger.info("✓ Install script completed")
 
@@ -56,7 +53,6 @@ class FlutterOnlyIntegrationTest(ContainerIntegrationTest):
             cd /home/testuser &&
             source ~/.bashrc &&
             test -d ~/.komodo-codex-env &&
-            export PATH="$HOME/.local/bin:$PATH" &&
             uv --version &&
             echo "Basic installation verified"
             """
@@ -69,9 +65,6 @@ class FlutterOnlyIntegrationTest(ContainerIntegrationTest):
             setup_command = """
             cd /home/testuser &&
             source ~/.bashrc &&
-            export PATH="$HOME/.local/bin:$PATH" &&
-            export HOME="/home/testuser" &&
-            export USER="testuser" &&
             cd ~/.komodo-codex-env &&
             uv run komodo-codex-env setup \
                 --flutter-version stable \
@@ -79,25 +72,30 @@ class FlutterOnlyIntegrationTest(ContainerIntegrationTest):
                 --platforms web,linux \
                 --verbose
             """
-            result = self.run_in_container(setup_command, timeout=1200)
+            result = self.run_in_container(setup_command, timeout=1200, stream=True)
             
             if result.returncode != 0:
                 logger.error(f"Flutter setup failed with exit code: {result.returncode}")
-                logger.error(f"STDOUT: {result.stdout}")
-                logger.error(f"STDERR: {result.stderr}")
+                logger.error(f"Output (last lines): {result.stdout}")
                 # Skip instead of fail to avoid blocking other tests
-                self.skipTest(f"Flutter setup failed: {result.stderr}")
+                self.skipTest(f"Flutter setup failed: {result.stdout}")
             
             logger.info("✓ Flutter setup completed")
         except Exception as e:
             self.skipTest(f"Integration test failed with exception: {e}")
 
+    def test_flutter_only_pipeline(self):
+        """Test the complete Flutter-only development pipeline."""
+        logger.info("Starting Flutter-only integration test pipeline")
+
+        # Steps 1-3 run once per class container (or not at all from a snapshot)
+        self.ensure_environment()
+
         # Step 4: Verify Flutter installation with detailed diagnostics
         logger.info("Step 4: Verifying Flutter installation")
         flutter_check_command = """
         cd /home/testuser &&
         source ~/.bashrc &&
-        export PATH="$HOME/.local/bin:$PATH" &&
         cd ~/.komodo-codex-env &&
         echo "=== Environment Check ===" &&
         echo "PATH: $PATH" &&
@@ -126,7 +124,6 @@ class FlutterOnlyIntegrationTest(ContainerIntegrationTest):
         create_app_command = """
         cd /home/testuser &&
         source ~/.bashrc &&
-        export PATH="$HOME/.local/bin:$PATH" &&
         cd ~/.komodo-codex-env &&
         # Use the flutter command through fvm that's been set up
         source setup_env.sh &&
@@ -140,33 +137,28 @@ class FlutterOnlyIntegrationTest(ContainerIntegrationTest):
         cd test_app &&
         fvm flutter pub get
         """
-        result = self.run_in_container(create_app_command, timeout=600)
+        result = self.run_in_container(create_app_command, timeout=600, stream=True)
         self.assert_command_success(result, "Flutter app creation failed")
         logger.info("✓ Flutter app created")
 
-        # Step 6: Build for web
-        logger.info("Step 6: Building Flutter app for web")
-        build_web_command = """
-        cd ~/.komodo-codex-env/test_app &&
-        source ~/.komodo-codex-env/setup_env.sh &&
-        fvm flutter build web
-        """
-        result = self.run_in_container(build_web_command, timeout=600)
-        self.assert_command_success(result, "Flutter web build failed")
-        logger.info("✓ Flutter web build completed")
-
-        # Step 7: Verify build artifacts
-        logger.info("Step 7: Verifying build artifacts")
-        verify_build_command = """
-        cd ~/.komodo-codex-env/test_app &&
-        test -f build/web/main.dart.js &&
-        test -f build/web/index.html &&
-        echo "Web build artifacts found" &&
-        ls -la build/web/ | head -10
-        """
-        result = self.run_in_container(verify_build_command)
-        self.assert_command_success(result, "Build artifacts verification failed")
-        logger.info("✓ Build artifacts verified")
+        # Steps 6-7: Build for web and verify the artifacts in a single exec
+        logger.info("Steps 6-7: Building Flutter app for web and verifying artifacts")
+        result, failed_step = self.run_steps_in_container(
+            {
+                "Flutter web build": "fvm flutter build web",
+                "Build artifacts verification": (
+                    "test -f build/web/main.dart.js &&\n"
+                    "test -f build/web/index.html &&\n"
+                    'echo "Web build artifacts found" &&\n'
+                    "ls -la build/web/ | head -10"
+                ),
+            },
+            preamble="cd ~/.komodo-codex-env/test_app &&\nsource ~/.komodo-codex-env/setup_env.sh",
+            timeout=660,
+            stream=True
+        )
+        self.assert_command_success(result, f"{failed_step} failed")
+        logger.info("✓ Flutter web build completed and artifacts verified")
 
         logger.info("✓ Flutter-only integration test completed successfully!")
 
@@ -6,15 +6,49 @@ the setup command, and verifies that melos is installed correctly.
 """
 
 import logging
-from pathlib import Path
+import unittest
 
 from .base_integration_test import ContainerIntegrationTest
+from .paths import PATHS
 
 logger = logging.getLogger(__name__)
 
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
-DOCKERFILE = PROJECT_ROOT / ".devcontainer" / "Dockerfile"
-INSTALL_SCRIPT = PROJECT_ROOT / "install.sh"
+
+# Files uploaded for the melos steps, relative to the test user's home
+_DART_WRAPPER = b"""#!/bin/bash
+exec fvm dart "$@"
+"""
+# pubspec.yaml for melos 3.0.0+ compatibility
+_MELOS_PUBSPEC = b"""name: test_workspace
+description: A test melos workspace
+version: 1.0.0
+
+environment:
+  sdk: '>=2.17.0 <4.0.0'
+
+dev_dependencies:
+  melos: ^6.0.0
+"""
+_MELOS_CONFIG = b"""name: test_workspace
+packages:
+  - packages/**
+
+command:
+  version:
+    branch: main
+  bootstrap:
+    usePubspecOverrides: true
+
+scripts:
+  analyze:
+    description: Run analysis for all packages
+    run: melos exec -- dart analyze .
+"""
+_MELOS_FILES = {
+    "bin/dart": _DART_WRAPPER,  # dart wrapper for melos compatibility
+    ".komodo-codex-env/test_melos_workspace/pubspec.yaml": _MELOS_PUBSPEC,
+    ".komodo-codex-env/test_melos_workspace/melos.yaml": _MELOS_CONFIG,
+}
 
 
 class KdfSdkIntegrationTest(ContainerIntegrationTest):
@@ -23,27 +57,37 @@ class KdfSdkIntegrationTest(ContainerIntegrationTest):
     # Class configuration for base class
     IMAGE_NAME = "kdf-sdk-test"
     CONTAINER_PREFIX = "kdf-sdk-test"
-    DOCKERFILE = DOCKERFILE
-    BUILD_CONTEXT = PROJECT_ROOT
+    DOCKERFILE = PATHS.dockerfile_str
+    BUILD_CONTEXT = PATHS.project_root_str
     CONTAINER_TIMEOUT = 3600  # 1 hour
-
-    def test_kdf_sdk_pipeline(self):
-        """Test the complete KDF-SDK development pipeline."""
-        logger.info("Starting KDF-SDK integration test pipeline")
-
+    # Keep uv downloads and the pub-cache (fvm, melos) warm between runs
+    CACHE_MOUNTS = {
+        "uv": "/home/testuser/.cache/uv",
+        "pub-cache": "/home/testuser/.pub-cache",
+    }
+    # Puts the uploaded dart wrapper (~/bin) first on PATH in every exec
+    CONTAINER_ENV = {"KOMODO_EXTRA_PATH": "/home/testuser/bin"}
+
+    @classmethod
+    def _get_container_config(cls):
+        """Get KDF-SDK container configuration with a tmpfs-backed ~/.cache."""
+        config = super()._get_container_config()
+        config["extra_args"].extend(["--tmpfs", "/home/testuser/.cache:rw,exec,size=2g"])
+        return config
+
+    def _prepare_environment(self):
+        """Run install.sh and the komodo-codex-env setup (steps 1-3)."""
         try:
             # Step 1: Copy and run install script with KDF-SDK install type
             logger.info("Step 1: Running install script with KDF-SDK install type")
-            success = self.copy_to_container(INSTALL_SCRIPT, "/home/testuser/install.sh")
+            success = self.copy_install_script(PATHS.install_script, "/home/testuser/install.sh")
             self.assertTrue(success, "Failed to copy install script")
 
             install_command = """
             cd /home/testuser &&
-            sed -i 's/read -p "Do you want to run the full setup now.*/REPLY="n"/' install.sh &&
-            sed -i 's/kce-full-setup "$FLUTTER_VERSION"/echo "Skipping auto full setup"/' install.sh &&
             timeout 600 ./install.sh --install-type KDF-SDK --debug
             """
-            result = self.run_in_container(install_command, timeout=700)
+            result = self.run_in_container(install_command, timeout=700, stream=True)
             self.skip_on_command_failure(result, "Install script with KDF-SDK type failed")
             logger.info("✓ Install script with KDF-SDK type completed")
 
@@ -53,7 +97,6 @@ class KdfSdkIntegrationTest(ContainerIntegrationTest):
             cd /home/testuser &&
             source ~/.bashrc &&
             test -d ~/.komodo-codex-env &&
-            export PATH="$HOME/.local/bin:$PATH" &&
             uv --version &&
             echo "Basic installation verified"
             """
@@ -66,69 +109,70 @@ class KdfSdkIntegrationTest(ContainerIntegrationTest):
             setup_command = """
             cd /home/testuser &&
             source ~/.bashrc &&
-            export PATH="$HOME/.local/bin:$PATH" &&
-            export HOME="/home/testuser" &&
-            export USER="testuser" &&
             cd ~/.komodo-codex-env &&
             uv run komodo-codex-env setup --install-type KDF-SDK --verbose
             """
-            result = self.run_in_container(setup_command, timeout=1200)
+            result = self.run_in_container(setup_command, timeout=1200, stream=True)
             
-            # Don't fail on setup errors - KDF-SDK setup might have warnings
+            # Don't fail on setup errors - KDF-SDK setup might have warnings -
+            # but keep the half-configured result out of the snapshot
             if result.returncode != 0:
                 logger.warning(f"KDF-SDK setup completed with warnings (exit code: {result.returncode})")
                 logger.info("This is often expected for melos 3.0.0+ which requires local pubspec.yaml setup")
-            else:
-                logger.info("✓ KDF-SDK setup completed")
-                
+                return False
+            logger.info("✓ KDF-SDK setup completed")
+            
+        except (unittest.SkipTest, AssertionError):
+            # A failed install must not return normally, or it would be
+            # snapshotted as the prepared environment
+            raise
         except Exception as e:
             logger.warning(f"KDF-SDK setup exception: {e}")
             logger.info("Continuing with verification steps...")
+            return False
 
-        # Step 4: Verify Flutter installation (KDF-SDK includes Flutter)
-        logger.info("Step 4: Verifying Flutter installation")
-        flutter_check_command = """
-        cd /home/testuser &&
-        source ~/.bashrc &&
-        export PATH="$HOME/.local/bin:$PATH" &&
-        cd ~/.komodo-codex-env &&
-        source setup_env.sh &&
-        fvm flutter --version &&
-        echo "Flutter toolchain verified"
-        """
-        result = self.run_in_container(flutter_check_command, timeout=120)
-        self.assert_command_success(result, "Flutter toolchain verification failed")
-        logger.info("✓ Flutter toolchain verified")
+    def test_kdf_sdk_pipeline(self):
+        """Test the complete KDF-SDK development pipeline."""
+        logger.info("Starting KDF-SDK integration test pipeline")
+
+        # Steps 1-3 run once per class container (or not at all from a snapshot)
+        self.ensure_environment()
 
-        # Step 5: Verify Dart installation
-        logger.info("Step 5: Verifying Dart installation")
-        dart_check_command = """
+        # Step 4: Verify Flutter and Dart toolchains (KDF-SDK includes Flutter)
+        logger.info("Step 4: Verifying Flutter and Dart toolchains")
+        toolchain_preamble = """
         cd /home/testuser &&
         source ~/.bashrc &&
-        export PATH="$HOME/.local/bin:$PATH" &&
         cd ~/.komodo-codex-env &&
-        source setup_env.sh &&
-        fvm dart --version &&
-        echo "Dart toolchain verified"
+        source setup_env.sh
         """
-        result = self.run_in_container(dart_check_command, timeout=120)
-        self.assert_command_success(result, "Dart toolchain verification failed")
-        logger.info("✓ Dart toolchain verified")
-
-        # Step 6: Verify melos installation (main KDF-SDK requirement)
-        logger.info("Step 6: Verifying melos installation")
+        results = self.run_checks_in_container(
+            {"flutter": "fvm flutter --version", "dart": "fvm dart --version"},
+            preamble=toolchain_preamble,
+            timeout=240
+        )
+        missing = [name for name, ok in results.items() if not ok]
+        self.assertFalse(missing, f"Toolchain verification failed for: {', '.join(missing)}")
+        logger.info("✓ Flutter and Dart toolchains verified")
+
+        # Step 5: Verify melos installation (main KDF-SDK requirement)
+        logger.info("Step 5: Verifying melos installation")
+        # The dart wrapper and the workspace files for step 6 go up in one upload
+        success = self.write_files_in_container(_MELOS_FILES, "/home/testuser")
+        self.assertTrue(success, "Failed to upload melos files")
+        # The upload must not take the install directory away from testuser
+        owners = self.run_in_container(
+            "stat -c %U /home/testuser/.komodo-codex-env "
+            + " ".join(f"/home/testuser/{name}" for name in _MELOS_FILES)
+        )
+        self.assert_command_success(owners, "Failed to stat uploaded melos files")
+        self.assertEqual(set(owners.stdout.split()), {"testuser"},
+                         "Uploaded melos files are not owned by testuser")
         melos_check_command = """
         cd /home/testuser &&
         source ~/.bashrc &&
-        export PATH="$HOME/.local/bin:$PATH" &&
         cd ~/.komodo-codex-env &&
         source setup_env.sh &&
-        # Create dart wrapper for melos compatibility
-        mkdir -p ~/bin &&
-        echo '#!/bin/bash' > ~/bin/dart &&
-        echo 'exec fvm dart "$@"' >> ~/bin/dart &&
-        chmod +x ~/bin/dart &&
-        export PATH="$HOME/bin:$PATH" &&
         # Try global melos first
         if melos --version 2>/dev/null; then
             echo "Global melos found"
@@ -147,52 +191,14 @@ class KdfSdkIntegrationTest(ContainerIntegrationTest):
         else:
             logger.info("✓ Melos installation verified")
 
-        # Step 7: Test melos functionality with a sample project
-        logger.info("Step 7: Testing melos functionality")
+        # Step 6: Test melos functionality with a sample project
+        logger.info("Step 6: Testing melos functionality")
         melos_test_command = """
         cd /home/testuser &&
         source ~/.bashrc &&
-        export PATH="$HOME/.local/bin:$PATH" &&
         cd ~/.komodo-codex-env &&
         source setup_env.sh &&
-        # Create dart wrapper for melos compatibility
-        mkdir -p ~/bin &&
-        echo '#!/bin/bash' > ~/bin/dart &&
-        echo 'exec fvm dart "$@"' >> ~/bin/dart &&
-        chmod +x ~/bin/dart &&
-        export PATH="$HOME/bin:$PATH" &&
-        rm -rf test_melos_workspace &&
-        mkdir -p test_melos_workspace &&
         cd test_melos_workspace &&
-        # Create pubspec.yaml for melos 3.0.0+ compatibility
-        cat > pubspec.yaml << 'EOF'
-name: test_workspace
-description: A test melos workspace
-version: 1.0.0
-
-environment:
-  sdk: '>=2.17.0 <4.0.0'
-
-dev_dependencies:
-  melos: ^6.0.0
-EOF
-        # Create a basic melos.yaml
-        cat > melos.yaml << 'EOF'
-name: test_workspace
-packages:
-  - packages/**
-
-command:
-  version:
-    branch: main
-  bootstrap:
-    usePubspecOverrides: true
-
-scripts:
-  analyze:
-    description: Run analysis for all packages
-    run: melos exec -- dart analyze .
-EOF
         # Get dependencies for melos
         fvm dart pub get &&
         # Create a simple package structure
@@ -204,32 +210,30 @@ EOF
         fvm dart run melos bootstrap &&
         echo "Melos workspace setup and bootstrap completed"
         """
-        result = self.run_in_container(melos_test_command, timeout=600)
+        result = self.run_in_container(melos_test_command, timeout=600, stream=True)
         self.assert_command_success(result, "Melos functionality test failed")
         logger.info("✓ Melos functionality verified")
 
-        # Step 8: Verify melos can run commands
-        logger.info("Step 8: Testing melos command execution")
+        # Step 7: Verify melos can run commands
+        logger.info("Step 7: Testing melos command execution")
         melos_command_test = """
         cd /home/testuser/test_melos_workspace &&
         source ~/.komodo-codex-env/setup_env.sh &&
-        export PATH="$HOME/bin:$PATH" &&
         # List packages
         fvm dart run melos list &&
         # Run analysis (if analyze script is available)
         fvm dart run melos run analyze || echo "Analysis completed or not configured" &&
         echo "Melos command execution verified"
         """
-        result = self.run_in_container(melos_command_test, timeout=300)
+        result = self.run_in_container(melos_command_test, timeout=300, stream=True)
         self.assert_command_success(result, "Melos command execution failed")
         logger.info("✓ Melos command execution verified")
 
-        # Step 9: Verify Node.js and npm (often needed for KDF-SDK projects)
-        logger.info("Step 9: Verifying Node.js and npm installation")
+        # Step 8: Verify Node.js and npm (often needed for KDF-SDK projects)
+        logger.info("Step 8: Verifying Node.js and npm installation")
         node_check_command = """
         cd /home/testuser &&
         source ~/.bashrc &&
-        export PATH="$HOME/.local/bin:$PATH" &&
         node --version &&
         npm --version &&
         echo "Node.js and npm verified"
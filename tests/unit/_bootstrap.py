@@ -0,0 +1,38 @@
+"""
+Shared imports for the unit tests.
+
+Puts ``src`` on ``sys.path`` once per interpreter and imports the modules under
+test, so the test modules share a single set of imports. When a dependency is
+missing the names are set to None and ``IMPORT_ERROR`` records why, letting
+each test class skip itself.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+SRC_DIR = str(Path(__file__).resolve().parents[2] / "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# Probed without importing, so a skipped run does not load them
+HAS_DEPS = all(importlib.util.find_spec(name) for name in ("rich", "requests"))
+
+try:
+    from komodo_codex_env.config import EnvironmentConfig
+    from komodo_codex_env.executor import CommandExecutor
+    from komodo_codex_env.dependency_manager import DependencyManager
+    from komodo_codex_env.android_manager import AndroidManager
+    from komodo_codex_env.flutter_manager import FlutterManager
+except ImportError as e:
+    EnvironmentConfig = CommandExecutor = DependencyManager = None
+    AndroidManager = FlutterManager = None
+    IMPORT_ERROR = e
+else:
+    IMPORT_ERROR = None
+
+# The orchestrator pulls in every manager, so it can be missing on its own
+try:
+    from komodo_codex_env.setup import EnvironmentSetup
+except ImportError:
+    EnvironmentSetup = None
@@ -5,66 +5,112 @@ These tests provide fast feedback without requiring Docker or actual installatio
 They test the core logic for detecting Android SDK and FVM installations.
 """
 
+import copy
 import unittest
 import os
+import shutil
+import stat
+import subprocess
 import tempfile
 from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock
-import sys
+from unittest.mock import Mock, patch
+
+from ._bootstrap import (
+    IMPORT_ERROR, AndroidManager, DependencyManager, EnvironmentConfig,
+    FlutterManager,
+)
+
+# AndroidManager attribute -> expected path for the default SDK location
+_EXPECTED_SDK_SUBDIRS = (
+    ("android_tools_dir", "/opt/android-sdk/tools"),
+    ("android_platform_tools_dir", "/opt/android-sdk/platform-tools"),
+    ("android_cmdline_tools_dir", "/opt/android-sdk/cmdline-tools/latest"),
+)
+# EnvironmentConfig attribute -> default value
+_EXPECTED_ANDROID_DEFAULTS = (
+    ("install_android_sdk", True),
+    ("android_api_level", "35"),
+    ("android_build_tools_version", "35.0.1"),
+)
+
+
+def _touch_exec(path: Path):
+    """Create an empty executable file, mode set at creation (minus umask)."""
+    os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o755))
+
+
+class FakeExecutor:
+    """Stand-in for CommandExecutor that records what it is asked to run."""
+    
+    def __init__(self):
+        self.command_exists = False
+        self.result = subprocess.CompletedProcess("", 0, stdout="", stderr="")
+        self.checked = []
+        self.commands = []
+    
+    def check_command_exists(self, command: str) -> bool:
+        self.checked.append(command)
+        return self.command_exists
+    
+    def run_command(self, command: str, **kwargs) -> subprocess.CompletedProcess:
+        self.commands.append(command)
+        return self.result
 
-# Add the src directory to the path
-sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
 
-try:
-    from komodo_codex_env.android_manager import AndroidManager
-    from komodo_codex_env.flutter_manager import FlutterManager
-    from komodo_codex_env.config import EnvironmentConfig
-    from komodo_codex_env.executor import CommandExecutor
-    from komodo_codex_env.dependency_manager import DependencyManager
-except ImportError as e:
-    AndroidManager = FlutterManager = EnvironmentConfig = CommandExecutor = DependencyManager = None
-    import_error = e
+class ClassTempDirMixin:
+    """One temporary directory per class; each test gets its own subdirectory."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Create the class directory, removed once the class has run."""
+        super().setUpClass()
+        cls._temp_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls._temp_root, ignore_errors=True)
+    
+    def make_temp_path(self) -> Path:
+        """Create a subdirectory of the class directory removed after the test."""
+        temp_path = Path(tempfile.mkdtemp(dir=self._temp_root))
+        self.addCleanup(shutil.rmtree, temp_path, ignore_errors=True)
+        return temp_path
 
 
-@unittest.skipIf(AndroidManager is None, f"Cannot import required modules: {import_error if 'import_error' in locals() else 'Unknown error'}")
-class AndroidSDKLocationUnitTest(unittest.TestCase):
+@unittest.skipIf(AndroidManager is None, f"Cannot import required modules: {IMPORT_ERROR}")
+class AndroidSDKLocationUnitTest(ClassTempDirMixin, unittest.TestCase):
     """Unit tests for Android SDK location detection and configuration."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Build the default config and dependency manager mock once per class."""
+        super().setUpClass()
+        cls._config_template = EnvironmentConfig()
+        # Spec mocks introspect their class when built; reset them per test instead
+        cls._dep_manager_mock = Mock(spec=DependencyManager)
+    
     def setUp(self):
         """Set up test environment."""
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.temp_path = Path(self.temp_dir.name)
+        self.temp_path = self.make_temp_path()
         
         # Create mock config
-        self.config = EnvironmentConfig()
+        self.config = copy.copy(self._config_template)
         self.config.android_home = None  # Let it use default
         
-        # Create mock executor and dependency manager
-        self.executor = Mock(spec=CommandExecutor)
-        self.dep_manager = Mock(spec=DependencyManager)
+        # Fake executor and the class's reset mock dependency manager
+        self.executor = FakeExecutor()
+        self.dep_manager = self._dep_manager_mock
+        self.dep_manager.reset_mock(return_value=True, side_effect=True)
         
         # Create AndroidManager instance
         self.android_manager = AndroidManager(self.config, self.executor, self.dep_manager)
 
-    def tearDown(self):
-        """Clean up test environment."""
-        self.temp_dir.cleanup()
-
     def test_default_android_home_path(self):
         """Test that default Android SDK path is /opt/android-sdk."""
         self.assertEqual(str(self.android_manager.android_home), "/opt/android-sdk")
 
     def test_android_sdk_subdirectories(self):
         """Test that Android SDK subdirectories are correctly configured."""
-        expected_paths = {
-            "tools": "/opt/android-sdk/tools",
-            "platform_tools": "/opt/android-sdk/platform-tools", 
-            "cmdline_tools": "/opt/android-sdk/cmdline-tools/latest",
-        }
-        
-        self.assertEqual(str(self.android_manager.android_tools_dir), expected_paths["tools"])
-        self.assertEqual(str(self.android_manager.android_platform_tools_dir), expected_paths["platform_tools"])
-        self.assertEqual(str(self.android_manager.android_cmdline_tools_dir), expected_paths["cmdline_tools"])
+        for attr, expected in _EXPECTED_SDK_SUBDIRS:
+            with self.subTest(attr):
+                self.assertEqual(str(getattr(self.android_manager, attr)), expected)
 
     def test_custom_android_home_path(self):
         """Test that custom Android SDK path is respected."""
@@ -80,7 +126,7 @@ class AndroidSDKLocationUnitTest(unittest.TestCase):
         android_home = self.temp_path / "android-sdk"
         cmdline_tools = android_home / "cmdline-tools" / "latest" / "bin" 
         cmdline_tools.mkdir(parents=True)
-        (cmdline_tools / "sdkmanager").touch()
+        _touch_exec(cmdline_tools / "sdkmanager")
         
         # Configure manager to use temp directory
         self.android_manager.android_home = android_home
@@ -107,42 +153,45 @@ class AndroidSDKLocationUnitTest(unittest.TestCase):
     def test_java_detection_mocking(self):
         """Test Java detection with mocked command executor."""
         # Test when Java is available
-        self.executor.check_command_exists.return_value = True
+        self.executor.command_exists = True
         self.assertTrue(self.android_manager.is_java_installed())
         
         # Verify correct commands were checked
-        expected_calls = [unittest.mock.call("java"), unittest.mock.call("javac")]
-        self.executor.check_command_exists.assert_has_calls(expected_calls)
+        self.assertEqual(self.executor.checked, ["java", "javac"])
         
         # Test when Java is not available
-        self.executor.check_command_exists.return_value = False
+        self.executor.command_exists = False
         self.assertFalse(self.android_manager.is_java_installed())
 
 
-@unittest.skipIf(FlutterManager is None, f"Cannot import required modules: {import_error if 'import_error' in locals() else 'Unknown error'}")
-class FVMLocationUnitTest(unittest.TestCase):
+@unittest.skipIf(FlutterManager is None, f"Cannot import required modules: {IMPORT_ERROR}")
+class FVMLocationUnitTest(ClassTempDirMixin, unittest.TestCase):
     """Unit tests for FVM location detection and configuration."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Build the default config and dependency manager mock once per class."""
+        super().setUpClass()
+        cls._config_template = EnvironmentConfig()
+        # Spec mocks introspect their class when built; reset them per test instead
+        cls._dep_manager_mock = Mock(spec=DependencyManager)
+    
     def setUp(self):
         """Set up test environment."""
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.temp_path = Path(self.temp_dir.name)
+        self.temp_path = self.make_temp_path()
         
         # Create mock config
-        self.config = EnvironmentConfig()
+        self.config = copy.copy(self._config_template)
         self.config.home_dir = self.temp_path
         
-        # Create mock executor and dependency manager
-        self.executor = Mock(spec=CommandExecutor)
-        self.dep_manager = Mock(spec=DependencyManager)
+        # Fake executor and the class's reset mock dependency manager
+        self.executor = FakeExecutor()
+        self.dep_manager = self._dep_manager_mock
+        self.dep_manager.reset_mock(return_value=True, side_effect=True)
         
         # Create FlutterManager instance
         self.flutter_manager = FlutterManager(self.config, self.executor, self.dep_manager)
 
-    def tearDown(self):
-        """Clean up test environment."""
-        self.temp_dir.cleanup()
-
     def test_fvm_home_path_configuration(self):
         """Test that FVM home path is correctly configured."""
         expected_fvm_home = self.temp_path / ".fvm"
@@ -155,34 +204,33 @@ class FVMLocationUnitTest(unittest.TestCase):
 
     def test_fvm_detection_in_path(self):
         """Test FVM detection when fvm is in PATH."""
-        self.executor.check_command_exists.return_value = True
+        self.executor.command_exists = True
         self.assertTrue(self.flutter_manager.is_fvm_installed())
-        self.executor.check_command_exists.assert_called_with("fvm")
+        self.assertEqual(self.executor.checked, ["fvm"])
 
     def test_fvm_detection_in_pub_cache(self):
         """Test FVM detection in ~/.pub-cache/bin."""
-        self.executor.check_command_exists.return_value = False
+        self.executor.command_exists = False
         
         # Create FVM in pub-cache
         pub_cache_bin = self.temp_path / ".pub-cache" / "bin"
         pub_cache_bin.mkdir(parents=True)
-        fvm_binary = pub_cache_bin / "fvm"
-        fvm_binary.touch()
-        fvm_binary.chmod(0o755)
+        _touch_exec(pub_cache_bin / "fvm")
         
         self.assertTrue(self.flutter_manager.is_fvm_installed())
 
     def test_fvm_detection_common_locations(self):
         """Test FVM detection in common system locations."""
-        self.executor.check_command_exists.return_value = False
+        self.executor.command_exists = False
         
         # Test that we check multiple common paths
-        with patch('pathlib.Path.exists') as mock_exists:
-            mock_exists.return_value = False
-            self.assertFalse(self.flutter_manager.is_fvm_installed())
-            
-            # Verify we checked various locations
-            self.assertTrue(mock_exists.called)
+        checked = []
+        self.flutter_manager._is_file = lambda path: checked.append(path) or False
+        self.assertFalse(self.flutter_manager.is_fvm_installed())
+        
+        # Verify we checked various locations
+        self.assertIn(self.temp_path / ".pub-cache" / "bin" / "fvm", checked)
+        self.assertIn(self.temp_path / ".fvm" / "fvm", checked)
 
     def test_fvm_path_environment_setup(self):
         """Test that FVM path is correctly added to environment."""
@@ -190,7 +238,7 @@ class FVMLocationUnitTest(unittest.TestCase):
         pub_cache_bin.mkdir(parents=True)
         
         # Simulate FVM installation detection
-        self.executor.check_command_exists.return_value = False
+        self.executor.command_exists = False
         
         with patch.dict(os.environ, {}, clear=True):
             # The path setup would normally be done by shell integration
@@ -205,8 +253,33 @@ class FVMLocationUnitTest(unittest.TestCase):
         flutter_manager = FlutterManager(self.config, self.executor, self.dep_manager)
         self.assertEqual(flutter_manager.config.flutter_version, flutter_version)
 
+    def test_version_installed_matches_whole_entries(self):
+        """Test that only the Version column of `fvm list` counts as cached."""
+        self.executor.result.stdout = "│ 3.32.0 │ stable │"
+        
+        self.assertTrue(self.flutter_manager.is_version_installed("3.32.0"))
+        self.assertFalse(self.flutter_manager.is_version_installed("3.3"))
+        # Other columns do not count as cached versions
+        self.assertFalse(self.flutter_manager.is_version_installed("stable"))
+        
+        self.executor.result.stdout = "│ stable │ stable │ 3.32.0 │"
+        self.assertTrue(self.flutter_manager.is_version_installed("stable"))
+        self.assertFalse(self.flutter_manager.is_version_installed("3.32.0"))
+
+    def test_install_flutter_skips_cached_version(self):
+        """Test that a version already in the FVM cache is not installed again."""
+        self.config.flutter_version = "3.32.0"
+        self.executor.result.stdout = "3.32.0"
+        
+        with patch.object(self.flutter_manager, "install_fvm", return_value=True), \
+             patch.object(self.flutter_manager, "is_flutter_installed", return_value=True):
+            self.assertTrue(self.flutter_manager.install_flutter())
+        
+        self.assertNotIn("fvm install 3.32.0", self.executor.commands)
+        self.dep_manager.check_disk_space.assert_not_called()
+
 
-@unittest.skipIf(EnvironmentConfig is None, f"Cannot import required modules: {import_error if 'import_error' in locals() else 'Unknown error'}")
+@unittest.skipIf(EnvironmentConfig is None, f"Cannot import required modules: {IMPORT_ERROR}")
 class EnvironmentConfigurationUnitTest(unittest.TestCase):
     """Unit tests for environment configuration logic."""
     
@@ -215,23 +288,22 @@ class EnvironmentConfigurationUnitTest(unittest.TestCase):
         config = EnvironmentConfig()
         
         # Test default values
-        self.assertTrue(config.install_android_sdk)
-        self.assertEqual(config.android_api_level, "35")
-        self.assertEqual(config.android_build_tools_version, "35.0.1")
+        for attr, expected in _EXPECTED_ANDROID_DEFAULTS:
+            with self.subTest(attr):
+                self.assertEqual(getattr(config, attr), expected)
         self.assertIsNotNone(config.android_home)
 
     def test_android_configuration_from_environment(self):
         """Test Android configuration from environment variables."""
-        with patch.dict(os.environ, {
+        config = EnvironmentConfig.from_environment(env={
             "INSTALL_ANDROID_SDK": "false",
             "ANDROID_API_LEVEL": "34",
             "ANDROID_BUILD_TOOLS_VERSION": "34.0.0",
-        }):
-            config = EnvironmentConfig.from_environment()
-            
-            self.assertFalse(config.install_android_sdk)
-            self.assertEqual(config.android_api_level, "34")
-            self.assertEqual(config.android_build_tools_version, "34.0.0")
+        })
+        
+        self.assertFalse(config.install_android_sdk)
+        self.assertEqual(config.android_api_level, "34")
+        self.assertEqual(config.android_build_tools_version, "34.0.0")
 
     def test_platform_configuration(self):
         """Test platform configuration for Android builds."""
@@ -260,7 +332,7 @@ class EnvironmentConfigurationUnitTest(unittest.TestCase):
         self.assertIsInstance(config.home_dir, Path)
 
 
-class PathValidationTest(unittest.TestCase):
+class PathValidationTest(ClassTempDirMixin, unittest.TestCase):
     """Test path validation and normalization logic."""
     
     def test_android_sdk_path_normalization(self):
@@ -272,31 +344,30 @@ class PathValidationTest(unittest.TestCase):
             "/home/user/Android/Sdk",
         ]
         
-        for path_str in test_paths:
-            path = Path(path_str)
-            # Test that path can be resolved and is absolute when needed
-            if not path_str.startswith("~"):
-                self.assertTrue(path.is_absolute() or path_str.startswith("/"))
+        # Every path not relative to the home directory must be absolute
+        not_absolute = [
+            path_str for path_str in test_paths
+            if not path_str.startswith("~") and not os.path.isabs(path_str)
+        ]
+        self.assertEqual(not_absolute, [])
 
     def test_fvm_path_validation(self):
         """Test FVM path validation logic."""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-            
-            # Test various FVM installation patterns
-            fvm_locations = [
-                temp_path / ".pub-cache" / "bin" / "fvm",
-                temp_path / ".local" / "bin" / "fvm",
-                temp_path / ".fvm" / "fvm",
-            ]
+        temp_path = self.make_temp_path()
+        
+        # Test various FVM installation patterns
+        fvm_locations = [
+            temp_path / ".pub-cache" / "bin" / "fvm",
+            temp_path / ".local" / "bin" / "fvm",
+            temp_path / ".fvm" / "fvm",
+        ]
+        
+        for fvm_path in fvm_locations:
+            fvm_path.parent.mkdir(parents=True, exist_ok=True)
+            _touch_exec(fvm_path)
             
-            for fvm_path in fvm_locations:
-                fvm_path.parent.mkdir(parents=True, exist_ok=True)
-                fvm_path.touch()
-                
-                # Validate that path exists and is a file
-                self.assertTrue(fvm_path.exists())
-                self.assertTrue(fvm_path.is_file())
+            # Validate that path exists and is a file (one stat)
+            self.assertTrue(stat.S_ISREG(os.stat(fvm_path).st_mode))
 
 
 if __name__ == "__main__":
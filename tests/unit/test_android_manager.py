@@ -1,30 +1,35 @@
-import sys
+import os
 import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import Mock, patch
 
-# Add src to path for imports
-sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+from ._bootstrap import (
+    HAS_DEPS, AndroidManager, CommandExecutor, DependencyManager,
+    EnvironmentConfig,
+)
 
-try:
-    import rich, requests
-    from komodo_codex_env.config import EnvironmentConfig
-    from komodo_codex_env.executor import CommandExecutor
-    from komodo_codex_env.dependency_manager import DependencyManager
-    from komodo_codex_env.android_manager import AndroidManager
-except ImportError:
-    rich = None
-    requests = None
-    EnvironmentConfig = CommandExecutor = DependencyManager = AndroidManager = None
 
+def _make_tree(root: Path, dirs=(), files=()):
+    """Create ``dirs`` and empty ``files`` (paths relative to ``root``) in one pass."""
+    for directory in {*dirs, *(os.path.dirname(f) for f in files)}:
+        os.makedirs(root / directory, exist_ok=True)
+    for file in files:
+        os.close(os.open(root / file, os.O_CREAT | os.O_WRONLY, 0o644))
 
-@unittest.skipUnless(rich and requests, "Required dependencies not installed")
+
+@unittest.skipUnless(HAS_DEPS, "Required dependencies not installed")
 class AndroidManagerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Neither keeps per-test state; tests that stub them use patch.object
+        cls._executor = CommandExecutor()
+        cls._dep_manager = DependencyManager(cls._executor)
+
     def setUp(self):
         self.config = EnvironmentConfig()
-        self.executor = CommandExecutor()
-        self.dep_manager = DependencyManager(self.executor)
+        self.executor = self._executor
+        self.dep_manager = self._dep_manager
         self.android_manager = AndroidManager(self.config, self.executor, self.dep_manager)
 
     def test_android_manager_initialization(self):
@@ -55,10 +60,7 @@ class AndroidManagerTests(unittest.TestCase):
 
             self.assertFalse(manager.is_android_sdk_installed())
 
-            cmdline_tools_dir = manager.android_cmdline_tools_dir
-            cmdline_tools_dir.mkdir(parents=True, exist_ok=True)
-            (cmdline_tools_dir / "bin").mkdir(parents=True, exist_ok=True)
-            (cmdline_tools_dir / "bin" / "sdkmanager").touch()
+            _make_tree(manager.android_cmdline_tools_dir, files=["bin/sdkmanager"])
 
             self.assertTrue(manager.is_android_sdk_installed())
 
@@ -92,26 +94,15 @@ class AndroidManagerTests(unittest.TestCase):
 
             self.assertFalse(manager.verify_installation())
 
-            android_home = manager.android_home
-            android_home.mkdir(parents=True, exist_ok=True)
-
-            cmdline_tools_dir = manager.android_cmdline_tools_dir
-            cmdline_tools_dir.mkdir(parents=True, exist_ok=True)
-            (cmdline_tools_dir / "bin").mkdir(parents=True, exist_ok=True)
-            (cmdline_tools_dir / "bin" / "sdkmanager").touch()
-
-            platform_tools_dir = manager.android_platform_tools_dir
-            platform_tools_dir.mkdir(parents=True, exist_ok=True)
-            (platform_tools_dir / "adb").touch()
-            (platform_tools_dir / "fastboot").touch()  # Add missing fastboot
-
-            platforms_dir = android_home / "platforms"
-            platforms_dir.mkdir(parents=True, exist_ok=True)
-            (platforms_dir / "android-34").mkdir()
-
-            build_tools_dir = android_home / "build-tools"
-            build_tools_dir.mkdir(parents=True, exist_ok=True)
-            (build_tools_dir / "34.0.0").mkdir()
+            _make_tree(
+                manager.android_home,
+                dirs=["platforms/android-34", "build-tools/34.0.0"],
+                files=[
+                    "cmdline-tools/latest/bin/sdkmanager",
+                    "platform-tools/adb",
+                    "platform-tools/fastboot",
+                ],
+            )
 
             # Mock the SDK Manager command execution to return success
             with patch.object(manager.executor, "run_command") as mock_run:
@@ -8,6 +8,8 @@ import tempfile
 import os
 from pathlib import Path
 
+from ._bootstrap import SRC_DIR
+
 
 def test_fetch_docs_locally():
     """Test the fetch-docs command locally to see where files are created."""
@@ -31,7 +33,7 @@ def test_fetch_docs_locally():
             ]
             
             env = os.environ.copy()
-            env["PYTHONPATH"] = str(Path(original_cwd) / "src")
+            env["PYTHONPATH"] = SRC_DIR
             
             print(f"Running command: {' '.join(cmd)}")
             print(f"Working directory: {temp_path}")
@@ -1,148 +1,62 @@
-import sys
-import os
 import tempfile
 import unittest
 from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import Mock
 
-sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
-try:
-    import rich, requests
-    from komodo_codex_env.config import EnvironmentConfig
-    from komodo_codex_env.setup import EnvironmentSetup
-except ImportError:
-    rich = None
-    requests = None
-    EnvironmentConfig = EnvironmentSetup = None
+from ._bootstrap import HAS_DEPS, EnvironmentConfig, EnvironmentSetup
 
 
-@unittest.skipUnless(rich and requests, "Required dependencies not installed")
-class SetupIntegrationTests(unittest.IsolatedAsyncioTestCase):
-    async def test_parallel_flutter_android_setup(self):
-        with tempfile.TemporaryDirectory() as temp_dir:
-            config = EnvironmentConfig()
-            config.platforms = ["web", "android"]
-            config.install_android_sdk = True
-            config.parallel_execution = True
-            config.flutter_version = "stable"
-            config.initial_dir = Path(temp_dir)
-            config.android_home = Path(temp_dir) / "Android" / "Sdk"
+# name, config overrides, install_flutter result, install_android_sdk result,
+# expected setup result, whether the Android SDK install runs (None: unchecked)
+_FLUTTER_ANDROID_CASES = [
+    ("parallel", {}, True, True, True, True),
+    ("sequential", {"parallel_execution": False}, True, True, True, True),
+    ("android not in platforms", {"platforms": ["web", "linux"]}, True, True, True, False),
+    ("android disabled", {"install_android_sdk": False}, True, True, True, False),
+    ("flutter failure stops setup", {}, False, True, False, None),
+    ("android failure does not stop setup", {}, True, False, True, True),
+]
 
-            setup = EnvironmentSetup(config)
-            setup.flutter_manager.install_flutter = Mock(return_value=True)
-            setup.flutter_manager.configure_flutter = Mock(return_value=True)
-            setup.android_manager.install_android_sdk = Mock(return_value=True)
-            setup.android_manager.get_android_info = Mock(return_value={
-                "status": "installed",
-                "java_status": "installed",
-                "android_home": str(config.android_home),
-            })
-
-            success = await setup._setup_flutter_and_android()
-            self.assertTrue(success)
-            setup.flutter_manager.install_flutter.assert_called_once()
-            setup.flutter_manager.configure_flutter.assert_called_once()
-            setup.android_manager.install_android_sdk.assert_called_once()
 
-    async def test_sequential_flutter_android_setup(self):
+@unittest.skipUnless(HAS_DEPS, "Required dependencies not installed")
+class SetupIntegrationTests(unittest.IsolatedAsyncioTestCase):
+    async def test_flutter_android_setup(self):
         with tempfile.TemporaryDirectory() as temp_dir:
             config = EnvironmentConfig()
-            config.platforms = ["web", "android"]
-            config.install_android_sdk = True
-            config.parallel_execution = False
             config.flutter_version = "stable"
             config.initial_dir = Path(temp_dir)
             config.android_home = Path(temp_dir) / "Android" / "Sdk"
-
-            setup = EnvironmentSetup(config)
-            setup.flutter_manager.install_flutter = Mock(return_value=True)
-            setup.flutter_manager.configure_flutter = Mock(return_value=True)
-            setup.android_manager.install_android_sdk = Mock(return_value=True)
-
-            success = await setup._setup_flutter_and_android()
-            self.assertTrue(success)
-            setup.flutter_manager.install_flutter.assert_called_once()
-            setup.flutter_manager.configure_flutter.assert_called_once()
-            setup.android_manager.install_android_sdk.assert_called_once()
-
-    async def test_android_skip_when_not_in_platforms(self):
-        with tempfile.TemporaryDirectory() as temp_dir:
-            config = EnvironmentConfig()
-            config.platforms = ["web", "linux"]
-            config.install_android_sdk = True
-            config.parallel_execution = True
-            config.flutter_version = "stable"
-            config.initial_dir = Path(temp_dir)
-
-            setup = EnvironmentSetup(config)
-            setup.flutter_manager.install_flutter = Mock(return_value=True)
-            setup.flutter_manager.configure_flutter = Mock(return_value=True)
-            setup.android_manager.install_android_sdk = Mock(return_value=True)
-
-            success = await setup._setup_flutter_and_android()
-            self.assertTrue(success)
-            setup.flutter_manager.install_flutter.assert_called_once()
-            setup.flutter_manager.configure_flutter.assert_called_once()
-            setup.android_manager.install_android_sdk.assert_not_called()
-
-    async def test_android_skip_when_disabled(self):
-        with tempfile.TemporaryDirectory() as temp_dir:
-            config = EnvironmentConfig()
-            config.platforms = ["web", "android"]
-            config.install_android_sdk = False
-            config.parallel_execution = True
-            config.flutter_version = "stable"
-            config.initial_dir = Path(temp_dir)
-
-            setup = EnvironmentSetup(config)
-            setup.flutter_manager.install_flutter = Mock(return_value=True)
-            setup.flutter_manager.configure_flutter = Mock(return_value=True)
-            setup.android_manager.install_android_sdk = Mock(return_value=True)
-
-            success = await setup._setup_flutter_and_android()
-            self.assertTrue(success)
-            setup.flutter_manager.install_flutter.assert_called_once()
-            setup.flutter_manager.configure_flutter.assert_called_once()
-            setup.android_manager.install_android_sdk.assert_not_called()
-
-    async def test_flutter_failure_stops_setup(self):
-        with tempfile.TemporaryDirectory() as temp_dir:
-            config = EnvironmentConfig()
-            config.platforms = ["web", "android"]
-            config.install_android_sdk = True
-            config.parallel_execution = True
-            config.flutter_version = "stable"
-            config.initial_dir = Path(temp_dir)
-
-            setup = EnvironmentSetup(config)
-            setup.flutter_manager.install_flutter = Mock(return_value=False)
-            setup.flutter_manager.configure_flutter = Mock(return_value=True)
-            setup.android_manager.install_android_sdk = Mock(return_value=True)
-
-            success = await setup._setup_flutter_and_android()
-            self.assertFalse(success)
-            setup.flutter_manager.install_flutter.assert_called_once()
-            setup.flutter_manager.configure_flutter.assert_not_called()
-
-    async def test_android_failure_does_not_stop_setup(self):
-        with tempfile.TemporaryDirectory() as temp_dir:
-            config = EnvironmentConfig()
-            config.platforms = ["web", "android"]
-            config.install_android_sdk = True
-            config.parallel_execution = True
-            config.flutter_version = "stable"
-            config.initial_dir = Path(temp_dir)
-
+            # The phase reads the config on every call, so one setup serves all cases
             setup = EnvironmentSetup(config)
-            setup.flutter_manager.install_flutter = Mock(return_value=True)
-            setup.flutter_manager.configure_flutter = Mock(return_value=True)
-            setup.android_manager.install_android_sdk = Mock(return_value=False)
 
-            success = await setup._setup_flutter_and_android()
-            self.assertTrue(success)
-            setup.flutter_manager.install_flutter.assert_called_once()
-            setup.flutter_manager.configure_flutter.assert_called_once()
-            setup.android_manager.install_android_sdk.assert_called_once()
+            for name, overrides, flutter_ok, android_ok, expected, android_runs in _FLUTTER_ANDROID_CASES:
+                with self.subTest(name):
+                    config.platforms = ["web", "android"]
+                    config.install_android_sdk = True
+                    config.parallel_execution = True
+                    for field, value in overrides.items():
+                        setattr(config, field, value)
+
+                    setup.flutter_manager.install_flutter = Mock(return_value=flutter_ok)
+                    setup.flutter_manager.configure_flutter = Mock(return_value=True)
+                    setup.android_manager.install_android_sdk = Mock(return_value=android_ok)
+                    setup.android_manager.get_android_info = Mock(return_value={
+                        "status": "installed",
+                        "java_status": "installed",
+                        "android_home": str(config.android_home),
+                    })
+
+                    success = await setup._setup_flutter_and_android()
+                    self.assertEqual(success, expected)
+                    setup.flutter_manager.install_flutter.assert_called_once()
+                    if flutter_ok:
+                        setup.flutter_manager.configure_flutter.assert_called_once()
+                    else:
+                        setup.flutter_manager.configure_flutter.assert_not_called()
+                    if android_runs is True:
+                        setup.android_manager.install_android_sdk.assert_called_once()
+                    elif android_runs is False:
+                        setup.android_manager.install_android_sdk.assert_not_called()
 
     def test_config_android_settings(self):
         config = EnvironmentConfig()
@@ -151,9 +65,8 @@ class SetupIntegrationTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(config.android_build_tools_version, "35.0.1")
         self.assertIsNotNone(config.android_home)
 
-        with patch.dict(os.environ, {"INSTALL_ANDROID_SDK": "false"}):
-            config = EnvironmentConfig.from_environment()
-            self.assertFalse(config.install_android_sdk)
+        config = EnvironmentConfig.from_environment(env={"INSTALL_ANDROID_SDK": "false"})
+        self.assertFalse(config.install_android_sdk)
 
 
 if __name__ == "__main__":
@@ -1,34 +1,33 @@
 import unittest
 from unittest.mock import patch
 
-import sys
-from pathlib import Path
+from ._bootstrap import EnvironmentConfig, EnvironmentSetup
 
-sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
 
-from komodo_codex_env.config import EnvironmentConfig
-from komodo_codex_env.setup import EnvironmentSetup
-from komodo_codex_env.flutter_manager import FlutterManager
+class SystemDependencyTests(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Tests only patch methods for their own duration, so one setup serves all
+        cls.setup = EnvironmentSetup(EnvironmentConfig())
 
+    def setUp(self):
+        platforms = self.setup.config.platforms
+        self.addCleanup(setattr, self.setup.config, "platforms", platforms)
 
-class SystemDependencyTests(unittest.IsolatedAsyncioTestCase):
     async def test_node_dependencies_added_for_web(self):
-        config = EnvironmentConfig()
-        config.platforms = ["web"]
-        setup = EnvironmentSetup(config)
+        self.setup.config.platforms = ["web"]
 
-        with patch.object(setup.dep_manager, "install_dependencies", return_value=True) as mock_install:
-            await setup._setup_system_dependencies()
+        with patch.object(self.setup.dep_manager, "install_dependencies", return_value=True) as mock_install:
+            await self.setup._setup_system_dependencies()
             deps = mock_install.call_args.args[0]
             self.assertIn("nodejs", deps)
             self.assertIn("npm", deps)
 
     async def test_flutter_install_fails_without_disk_space(self):
-        config = EnvironmentConfig()
-        env_setup = EnvironmentSetup(config)
-        flutter_mgr = FlutterManager(config, env_setup.executor, env_setup.dep_manager)
+        flutter_mgr = self.setup.flutter_manager
 
         with patch.object(flutter_mgr, "install_fvm", return_value=True), \
+             patch.object(flutter_mgr, "is_version_installed", return_value=False), \
              patch.object(flutter_mgr.dep_manager, "check_disk_space", return_value=False):
             success = flutter_mgr.install_flutter()
             self.assertFalse(success)
@@ -36,4 +35,3 @@ class SystemDependencyTests(unittest.IsolatedAsyncioTestCase):
 
 if __name__ == "__main__":
     unittest.main()
-